@@ -2,91 +2,112 @@
 """
 Example script to analyze logs collected by the Network Logger extension.
 This demonstrates how to process the logs for security analysis.
+Optional: pip install json-stream (keeps memory flat on large log files)
+Optional: pip install orjson (faster loading when json-stream is not used)
+Optional: pip install pyahocorasick (single-pass suspicious pattern matching)
 """
 
+import heapq
 import json
-from collections import Counter, defaultdict
-from urllib.parse import urlparse
 import sys
 
+from log_aggregate import aggregate_logs, build_pattern_matcher
+
+try:
+    import json_stream
+except ImportError:
+    json_stream = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SUSPICIOUS_PATTERNS = [
+    ('.tk', 'Uncommon TLD .tk'),
+    ('.xyz', 'Uncommon TLD .xyz'),
+    ('base64', 'Base64 in URL'),
+    ('eval', 'Eval in URL'),
+]
+
+# Report only the first matching pattern per URL instead of every match
+SUSPICIOUS_FIRST_ONLY = True
+
+def iter_batches(f):
+    """Yield batches from a log file, streaming them when json-stream is installed."""
+    if json_stream is None:
+        yield from orjson.loads(f.read()) if orjson else json.load(f)
+        return
+
+    # Transient mode reads the file forward once; materializing one batch at a
+    # time keeps memory bounded by the largest batch and allows any key order.
+    try:
+        batches = json_stream.load(f, persistent=False)
+    except StopIteration:
+        # An empty file has no JSON value at all
+        raise json.JSONDecodeError('Expecting value', '', 0) from None
+    try:
+        for batch in batches:
+            yield json_stream.to_standard_types(batch)
+    except ValueError as e:
+        # json-stream has no decode error type of its own; it raises ValueError
+        raise json.JSONDecodeError(str(e), '', 0) from e
+
 def analyze_logs(log_file):
     """Analyze a JSON file containing logged requests."""
     
-    with open(log_file, 'r') as f:
-        data = json.load(f)
+    match_suspicious = build_pattern_matcher(SUSPICIOUS_PATTERNS, SUSPICIOUS_FIRST_ONLY)
     
-    # Flatten all logs from all batches
-    all_logs = []
-    for batch in data:
-        all_logs.extend(batch['logs'])
+    with open(log_file, 'rb') as f:
+        stats = aggregate_logs(iter_batches(f), match_suspicious)
     
     print(f"📊 Log Analysis Report")
     print(f"{'='*60}\n")
     
     # Basic statistics
-    print(f"Total requests logged: {len(all_logs)}")
-    print(f"Unique sessions: {len(set(batch['sessionId'] for batch in data))}")
+    print(f"Total requests logged: {stats['total_logs']}")
+    print(f"Unique sessions: {stats['session_count']}")
     print()
     
     # Request types
     print("🔍 Request Types:")
-    type_counts = Counter(log.get('type', 'unknown') for log in all_logs)
-    for req_type, count in type_counts.most_common():
+    for req_type, count in stats['type_counts'].most_common():
         print(f"  {req_type:20s}: {count:5d}")
     print()
     
     # JavaScript files
-    js_logs = [log for log in all_logs if log.get('isJavaScript') or log.get('type') == 'script']
-    print(f"📜 JavaScript Files: {len(js_logs)}")
-    if js_logs:
-        js_domains = Counter(urlparse(log['url']).netloc for log in js_logs)
+    print(f"📜 JavaScript Files: {stats['js_count']}")
+    if stats['js_count']:
         print("  Top domains serving JS:")
-        for domain, count in js_domains.most_common(10):
+        for domain, count in stats['js_domains'].most_common(10):
             print(f"    {domain:40s}: {count:3d}")
     print()
     
     # Blocked requests
-    blocked_logs = [log for log in all_logs if log.get('blocked')]
-    print(f"⛔ Blocked Requests: {len(blocked_logs)}")
-    if blocked_logs:
-        for log in blocked_logs[:10]:
-            print(f"  - {log['url']}")
+    print(f"⛔ Blocked Requests: {stats['blocked_count']}")
+    for url in stats['blocked_urls']:
+        print(f"  - {url}")
     print()
     
     # HTTP status codes
     print("📈 HTTP Status Codes:")
-    status_counts = Counter(log.get('statusCode') for log in all_logs if log.get('statusCode'))
-    for status, count in sorted(status_counts.items()):
+    for status, count in sorted(stats['status_counts'].items()):
         status_category = "✓" if 200 <= status < 300 else "⚠" if 300 <= status < 400 else "✗"
         print(f"  {status_category} {status}: {count}")
     print()
     
     # Domain analysis
     print("🌐 Top Domains:")
-    domain_counts = Counter(urlparse(log['url']).netloc for log in all_logs)
-    for domain, count in domain_counts.most_common(15):
+    for domain, count in stats['domain_counts'].most_common(15):
         print(f"  {domain:40s}: {count:3d}")
     print()
     
     # Third-party resources
     print("🔗 Third-Party Resources:")
-    page_domains = set()
-    third_party_resources = defaultdict(list)
-    
-    for log in all_logs:
-        if log.get('type') == 'navigation':
-            page_domains.add(urlparse(log['url']).netloc)
-        elif log.get('initiator'):
-            initiator_domain = urlparse(log.get('initiator', '')).netloc
-            resource_domain = urlparse(log['url']).netloc
-            if initiator_domain and resource_domain and initiator_domain != resource_domain:
-                third_party_resources[initiator_domain].append(resource_domain)
-    
-    for page_domain in sorted(page_domains)[:5]:
-        if page_domain in third_party_resources:
-            third_parties = Counter(third_party_resources[page_domain])
+    for page_domain in heapq.nsmallest(5, stats['page_domains']):
+        if page_domain in stats['third_party_resources']:
             print(f"  {page_domain}:")
-            for tp_domain, count in third_parties.most_common(5):
+            for tp_domain, count in stats['third_party_resources'][page_domain].most_common(5):
                 print(f"    → {tp_domain} ({count} requests)")
     print()
     
@@ -94,51 +115,30 @@ def analyze_logs(log_file):
     print("🔒 Security Analysis:")
     
     # Check for eval usage
-    eval_logs = [log for log in all_logs if log.get('scriptUrl') == 'eval']
-    if eval_logs:
-        print(f"  ⚠ Found {len(eval_logs)} eval() executions")
-        eval_pages = Counter(log['url'] for log in eval_logs)
+    if stats['eval_count']:
+        print(f"  ⚠ Found {stats['eval_count']} eval() executions")
         print("    Pages using eval():")
-        for page, count in eval_pages.most_common(5):
+        for page, count in stats['eval_pages'].most_common(5):
             print(f"      - {page} ({count} times)")
     
     # Check for mixed content
-    https_pages = set(log['url'] for log in all_logs if log.get('type') == 'navigation' and log['url'].startswith('https://'))
-    http_resources = [log for log in all_logs if log['url'].startswith('http://')]
-    mixed_content = [log for log in http_resources if any(log.get('initiator', '').startswith(page) for page in https_pages)]
-    if mixed_content:
-        print(f"  ⚠ Found {len(mixed_content)} potential mixed content issues")
+    if stats['mixed_content']:
+        print(f"  ⚠ Found {stats['mixed_content']} potential mixed content issues")
     
     # Check for suspicious patterns
-    suspicious_patterns = [
-        ('.tk', 'Uncommon TLD .tk'),
-        ('.xyz', 'Uncommon TLD .xyz'),
-        ('base64', 'Base64 in URL'),
-        ('eval', 'Eval in URL'),
-    ]
-    
-    suspicious_logs = []
-    for log in all_logs:
-        url_lower = log['url'].lower()
-        for pattern, reason in suspicious_patterns:
-            if pattern in url_lower:
-                suspicious_logs.append((log, reason))
-    
-    if suspicious_logs:
-        print(f"  ⚠ Found {len(suspicious_logs)} requests matching suspicious patterns:")
-        for log, reason in suspicious_logs[:10]:
-            print(f"    - {reason}: {log['url'][:80]}")
+    if stats['suspicious_count']:
+        print(f"  ⚠ Found {stats['suspicious_count']} requests matching suspicious patterns:")
+        for url, reason in stats['suspicious_logs']:
+            print(f"    - {reason}: {url[:80]}")
     
     print()
     
     # Performance analysis
     print("⚡ Performance Insights:")
-    failed_requests = [log for log in all_logs if log.get('statusCode', 0) >= 400]
-    if failed_requests:
-        print(f"  {len(failed_requests)} failed requests (4xx/5xx)")
-        failed_domains = Counter(urlparse(log['url']).netloc for log in failed_requests)
+    if stats['failed_count']:
+        print(f"  {stats['failed_count']} failed requests (4xx/5xx)")
         print("    Top failing domains:")
-        for domain, count in failed_domains.most_common(5):
+        for domain, count in stats['failed_domains'].most_common(5):
             print(f"      - {domain}: {count} failures")
     
     print()
@@ -2,27 +2,230 @@
 """
 Analyze YouTube channel blocking from extension logs.
 Shows statistics on blocked channels and access attempts.
+Optional: pip install orjson (faster decoding of matching records)
 """
 
+from bisect import bisect_left
+import heapq
 import json
+import mmap
+import os
+import re
 from collections import Counter, defaultdict
-from datetime import datetime
+from datetime import datetime, timezone
 import sys
 
+from log_aggregate import intern_str
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Inside a "logs" array (see _log_array_spans) a log record is an array
+# element: '{' preceded by '[' or ',' and followed by a key. Since every
+# unescaped '"' delimits a string, neither this nor the '},{"key' separator
+# can occur inside a string value.
+_RECORD_OPEN = re.compile(rb'\{\s*"[A-Za-z_]')
+_RECORD_END = re.compile(rb'\}(?=\s*,\s*\{\s*"[A-Za-z_])')
+_WHITESPACE = b' \t\r\n'
+_LEADING_WHITESPACE = re.compile(rb'\s*')
+_LOGS_KEY_BEFORE = re.compile(rb'"logs"\s*:\s*\Z')
+_STRUCTURE = re.compile(rb'[][{}]')
+
+# Shared stand-in for logs without channel info; never mutated
+_EMPTY_CHANNEL = {'id': 'Unknown', 'type': 'unknown'}
+
+def _is_record_start(buf, i):
+    """Check whether the '{' at buf[i] opens an array element."""
+    if not _RECORD_OPEN.match(buf, i):
+        return False
+    i -= 1
+    while i >= 0 and buf[i] in _WHITESPACE:
+        i -= 1
+    return i >= 0 and buf[i] in b',['
+
+def _escaped_quotes(buf):
+    """Return the positions of backslash-escaped '"' characters in buf."""
+    positions = []
+    i = buf.find(b'\\"')
+    while i >= 0:
+        j = i
+        while j > 0 and buf[j - 1] == 0x5c:
+            j -= 1
+        # The quote is escaped when an odd run of backslashes precedes it
+        if (i + 1 - j) % 2:
+            positions.append(i + 1)
+        i = buf.find(b'\\"', i + 2)
+    return positions
+
+def _log_array_spans(buf):
+    """Return the (open, close) bracket positions of every batch's "logs" array.
+    
+    Returns None unless buf is a single top-level array whose only nested
+    arrays are those "logs" arrays; only then is every '[{"key' / ',{"key'
+    object inside them a log record, which iter_candidate_logs relies on.
+    Nested arrays (such as requestHeaders) make those bounds ambiguous, and
+    anything else (a truncated file, a non-JSON page) is left to the full
+    parser to report. A bracket lies outside strings when an even number of
+    unescaped quotes precede it; object depth is only tracked between the
+    "logs" arrays, where just the batch fields are.
+    """
+    first = _LEADING_WHITESPACE.match(buf).end()
+    if buf[first:first + 1] != b'[':
+        return None
+    escaped = _escaped_quotes(buf)
+    quotes = 0
+    prev = 0
+    
+    def outside_string(i):
+        nonlocal quotes, prev
+        quotes += buf[prev:i].count(b'"') - (bisect_left(escaped, i) - bisect_left(escaped, prev))
+        prev = i
+        return quotes % 2 == 0
+    
+    spans = []
+    depth = 0       # object depth inside the top-level array
+    opened = None   # position of the current "logs" array's '['
+    i = first
+    while True:
+        if opened is None:
+            match = _STRUCTURE.search(buf, i + 1)
+            if match is None:
+                return None
+            i = match.start()
+        else:
+            # Inside a "logs" array only brackets matter, found at memchr speed
+            close = buf.find(b']', i + 1)
+            if close < 0:
+                return None
+            nested = buf.find(b'[', i + 1, close)
+            i = close if nested < 0 else nested
+        if not outside_string(i):
+            continue
+        char = buf[i:i + 1]
+        if opened is not None:
+            if char == b'[':
+                return None
+            spans.append((opened, i))
+            opened = None
+        elif char == b'{':
+            depth += 1
+        elif char == b'}':
+            if not depth:
+                return None
+            depth -= 1
+        elif char == b'[':
+            # Only a batch's own "logs" key, one object deep, opens a logs array
+            if depth != 1 or not _LOGS_KEY_BEFORE.search(buf, max(0, i - 64), i):
+                return None
+            opened = i
+        else:
+            # The top-level array must end the file
+            if depth:
+                return None
+            return spans if _LEADING_WHITESPACE.match(buf, i + 1).end() == len(buf) else None
+
+def _load(data):
+    """Parse a JSON document from a bytes-like object."""
+    if orjson is not None:
+        return orjson.loads(memoryview(data))
+    return json.loads(data[:])
+
+def iter_candidate_logs(buf, needle):
+    """Yield decoded log records, skipping most of those whose raw bytes lack needle.
+    
+    Records without the needle are never parsed: the scan jumps from one
+    occurrence to the next with bytes.find and only decodes the record
+    enclosing each hit (Sparser-style raw filtering). When logs contain
+    nested arrays the record bounds cannot be found this way, and every log
+    is parsed and yielded instead. Callers must still check the decoded
+    fields, since the needle may sit in any field.
+    """
+    spans = _log_array_spans(buf)
+    if spans is None:
+        for batch in _load(buf):
+            yield from batch['logs']
+        return
+    
+    for opened, closed in spans:
+        pos = opened + 1
+        while True:
+            hit = buf.find(needle, pos, closed)
+            if hit < 0:
+                break
+            start = buf.rfind(b'{', pos, hit)
+            while start >= 0 and not _is_record_start(buf, start):
+                start = buf.rfind(b'{', pos, start)
+            match = _RECORD_END.search(buf, hit, closed)
+            end = match.end() if match else closed
+            try:
+                if start < 0:
+                    raise ValueError('log record not found')
+                record = _load(buf[start:end])
+            except ValueError:
+                # Only logs lie between the brackets, so the file is malformed;
+                # let the full parser report where
+                _load(buf)
+                raise
+            yield record
+            pos = end
+
+# Python 3.11+ parses the 'Z' suffix directly; older versions need '+00:00'
+if sys.version_info >= (3, 11):
+    _parse_timestamp = datetime.fromisoformat
+else:
+    def _parse_timestamp(timestamp):
+        if timestamp.endswith('Z'):
+            timestamp = timestamp[:-1] + '+00:00'
+        return datetime.fromisoformat(timestamp)
+
+def iso_to_epoch(timestamp):
+    """Convert an ISO-8601 timestamp such as '2024-01-15T13:45:22.123Z' to whole epoch seconds.
+    
+    Timestamps without an offset are taken as UTC, so every reported time is
+    normalized to UTC.
+    """
+    parsed = _parse_timestamp(timestamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def format_epoch(epoch, fmt):
+    """Format epoch seconds as a UTC time string (reports are normalized to UTC)."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(fmt)
+
 def analyze_youtube_blocks(log_file):
     """Analyze YouTube blocking data from logs."""
     
-    with open(log_file, 'r') as f:
-        data = json.load(f)
-    
-    # Flatten all logs
-    all_logs = []
-    for batch in data:
-        all_logs.extend(batch['logs'])
+    # Only records mentioning youtube.com are parsed; the rest of the file is
+    # skipped at substring-search speed. Blocked logs are kept as one list
+    # per field rather than as full dicts, with repeated ids interned so each
+    # distinct value is stored once.
+    youtube_logs = 0
+    block_timestamps = []
+    block_urls = []
+    block_channel_ids = []
+    block_channel_types = []
+    block_sessions = []
+    with open(log_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap rejects empty files; report them like json.load would
+            raise json.JSONDecodeError('Expecting value', '', 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for log in iter_candidate_logs(buf, b'youtube.com'):
+                if 'youtube.com' not in log.get('url', ''):
+                    continue
+                youtube_logs += 1
+                if log.get('blocked') and log.get('blockReason') == 'youtube_channel':
+                    channel_info = log.get('youtubeChannelInfo') or _EMPTY_CHANNEL
+                    block_timestamps.append(log.get('timestamp'))
+                    block_urls.append(log.get('url', ''))
+                    block_channel_ids.append(intern_str(channel_info.get('id', 'Unknown')))
+                    block_channel_types.append(intern_str(channel_info.get('type', 'unknown')))
+                    block_sessions.append(intern_str(log.get('sessionId', 'unknown')))
     
-    # Filter for YouTube-related logs
-    youtube_logs = [log for log in all_logs if 'youtube.com' in log.get('url', '')]
-    youtube_blocks = [log for log in youtube_logs if log.get('blocked') and log.get('blockReason') == 'youtube_channel']
+    block_count = len(block_timestamps)
     
     print("🎬 YouTube Channel Blocking Analysis")
     print("=" * 70)
@@ -30,29 +233,31 @@ def analyze_youtube_blocks(log_file):
     
     # Basic stats
     print(f"📊 Overall Statistics:")
-    print(f"  Total YouTube requests: {len(youtube_logs)}")
-    print(f"  Blocked channel accesses: {len(youtube_blocks)}")
+    print(f"  Total YouTube requests: {youtube_logs}")
+    print(f"  Blocked channel accesses: {block_count}")
     if youtube_logs:
-        block_rate = (len(youtube_blocks) / len(youtube_logs)) * 100
+        block_rate = (block_count / youtube_logs) * 100
         print(f"  Block rate: {block_rate:.1f}%")
     print()
     
-    if not youtube_blocks:
+    if not block_count:
         print("No YouTube channel blocks found in logs.")
         return
     
-    # Extract channel information
+    # Each timestamp is parsed once into epoch seconds; hour buckets are plain
+    # integers and only the printed ones are formatted.
+    block_epochs = [iso_to_epoch(timestamp) for timestamp in block_timestamps]
+    
+    # Group attempt times by channel, remembering each channel's first type
     blocked_channels = defaultdict(list)
-    for log in youtube_blocks:
-        channel_info = log.get('youtubeChannelInfo', {})
-        channel_id = channel_info.get('id', 'Unknown')
-        channel_type = channel_info.get('type', 'unknown')
-        
-        blocked_channels[channel_id].append({
-            'timestamp': log.get('timestamp'),
-            'url': log.get('url'),
-            'type': channel_type
-        })
+    channel_types = {}
+    for channel_id, channel_type, epoch in zip(block_channel_ids, block_channel_types, block_epochs):
+        blocked_channels[channel_id].append(epoch)
+        channel_types.setdefault(channel_id, channel_type)
+    
+    hour_counts = Counter(epoch // 3600 for epoch in block_epochs)
+    type_counts = Counter(block_channel_types)
+    sessions = Counter(block_sessions)
     
     # Channel blocking summary
     print("🚫 Blocked Channels Summary:")
@@ -60,21 +265,19 @@ def analyze_youtube_blocks(log_file):
     print()
     
     print("📋 Top Blocked Channels:")
-    sorted_channels = sorted(
+    top_channels = heapq.nlargest(
+        10,
         blocked_channels.items(),
-        key=lambda x: len(x[1]),
-        reverse=True
+        key=lambda x: len(x[1])
     )
     
-    for i, (channel_id, attempts) in enumerate(sorted_channels[:10], 1):
-        channel_type = attempts[0]['type']
-        print(f"  {i}. {channel_id} ({channel_type})")
+    for i, (channel_id, attempts) in enumerate(top_channels, 1):
+        print(f"  {i}. {channel_id} ({channel_types[channel_id]})")
         print(f"     Access attempts: {len(attempts)}")
         
         # Show first and last attempt
-        timestamps = [datetime.fromisoformat(a['timestamp'].replace('Z', '+00:00')) for a in attempts]
-        first_attempt = min(timestamps).strftime('%Y-%m-%d %H:%M:%S')
-        last_attempt = max(timestamps).strftime('%Y-%m-%d %H:%M:%S')
+        first_attempt = format_epoch(min(attempts), '%Y-%m-%d %H:%M:%S')
+        last_attempt = format_epoch(max(attempts), '%Y-%m-%d %H:%M:%S')
         
         print(f"     First attempt: {first_attempt}")
         if len(attempts) > 1:
@@ -85,28 +288,16 @@ def analyze_youtube_blocks(log_file):
     print("📅 Timeline Analysis:")
     
     # Group by hour
-    hour_counts = Counter()
-    for log in youtube_blocks:
-        timestamp = datetime.fromisoformat(log['timestamp'].replace('Z', '+00:00'))
-        hour_key = timestamp.strftime('%Y-%m-%d %H:00')
-        hour_counts[hour_key] += 1
-    
     if hour_counts:
         print("  Blocks per hour (top 10):")
         for hour, count in hour_counts.most_common(10):
-            print(f"    {hour}: {count} blocks")
+            print(f"    {format_epoch(hour * 3600, '%Y-%m-%d %H:00')}: {count} blocks")
     print()
     
     # Access patterns
     print("🔍 Access Patterns:")
     
     # Count by channel type
-    type_counts = Counter()
-    for log in youtube_blocks:
-        channel_info = log.get('youtubeChannelInfo', {})
-        channel_type = channel_info.get('type', 'unknown')
-        type_counts[channel_type] += 1
-    
     print("  Blocks by channel identifier type:")
     for channel_type, count in type_counts.items():
         print(f"    {channel_type}: {count}")
@@ -114,11 +305,11 @@ def analyze_youtube_blocks(log_file):
     
     # Repeated access attempts
     print("🔁 Repeated Access Attempts:")
-    repeat_offenders = [(ch, len(attempts)) for ch, attempts in sorted_channels if len(attempts) >= 3]
+    repeat_offenders = [(ch, len(attempts)) for ch, attempts in blocked_channels.items() if len(attempts) >= 3]
     
     if repeat_offenders:
         print(f"  Channels with 3+ access attempts: {len(repeat_offenders)}")
-        for channel_id, count in repeat_offenders[:5]:
+        for channel_id, count in heapq.nlargest(5, repeat_offenders, key=lambda x: x[1]):
             print(f"    {channel_id}: {count} attempts")
     else:
         print("  No channels with repeated access attempts (3+)")
@@ -126,14 +317,9 @@ def analyze_youtube_blocks(log_file):
     
     # Session analysis
     print("📊 Session Analysis:")
-    sessions = defaultdict(int)
-    for log in youtube_blocks:
-        session_id = log.get('sessionId', 'unknown')
-        sessions[session_id] += 1
-    
     print(f"  Sessions with YouTube blocks: {len(sessions)}")
     if sessions:
-        avg_blocks = sum(sessions.values()) / len(sessions)
+        avg_blocks = block_count / len(sessions)
         print(f"  Average blocks per session: {avg_blocks:.1f}")
         max_blocks = max(sessions.values())
         print(f"  Max blocks in a session: {max_blocks}")
@@ -141,20 +327,18 @@ def analyze_youtube_blocks(log_file):
     
     # Recent blocks
     print("🕐 Recent Blocks (Last 10):")
-    sorted_blocks = sorted(
-        youtube_blocks,
-        key=lambda x: x.get('timestamp', ''),
-        reverse=True
+    recent_blocks = heapq.nlargest(
+        10,
+        range(block_count),
+        key=block_timestamps.__getitem__
     )
     
-    for i, log in enumerate(sorted_blocks[:10], 1):
-        timestamp = log.get('timestamp', 'Unknown')
-        channel_info = log.get('youtubeChannelInfo', {})
-        channel_id = channel_info.get('id', 'Unknown')
-        url = log.get('url', '')[:60] + '...' if len(log.get('url', '')) > 60 else log.get('url', '')
+    for i, index in enumerate(recent_blocks, 1):
+        url = block_urls[index]
+        url = url[:60] + '...' if len(url) > 60 else url
         
-        print(f"  {i}. [{timestamp}]")
-        print(f"     Channel: {channel_id}")
+        print(f"  {i}. [{block_timestamps[index]}]")
+        print(f"     Channel: {block_channel_ids[index]}")
         print(f"     URL: {url}")
         print()
     
@@ -5,24 +5,41 @@ Requires: pip install Pillow
 """
 
 from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ProcessPoolExecutor
 import sys
 
-def create_icon(size, filename):
+# Fonts to try, with the font size as a fraction of the icon size
+FONT_CANDIDATES = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 3, 4),
+    ("Arial.ttf", 1, 2),
+]
+
+def find_font():
+    """Return (font, numerator, denominator) for the first usable font, or None.
+    
+    The returned FreeTypeFont is resized per icon with font_variant().
+    """
+    for path, numerator, denominator in FONT_CANDIDATES:
+        try:
+            font = ImageFont.truetype(path, 16)
+        except (OSError, ImportError):
+            # Missing font file, or a Pillow build without FreeType
+            continue
+        return font, numerator, denominator
+    return None
+
+def create_icon(size, filename, font_spec=None):
     """Create a simple icon with specified size."""
     # Create image with blue background
     img = Image.new('RGB', (size, size), color='#2196F3')
     draw = ImageDraw.Draw(img)
     
-    # Try to use a font, fallback to default if not available
-    try:
-        font_size = size * 3 // 4
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-    except:
-        try:
-            font_size = size // 2
-            font = ImageFont.truetype("Arial.ttf", font_size)
-        except:
-            font = ImageFont.load_default()
+    # Use the font found by find_font(), fallback to default if not available
+    if font_spec:
+        font, numerator, denominator = font_spec
+        font = font.font_variant(size=size * numerator // denominator)
+    else:
+        font = ImageFont.load_default()
     
     # Draw text in center
     text = "🔍"
@@ -45,7 +62,6 @@ def create_icon(size, filename):
     
     # Save image
     img.save(filename)
-    print(f"✓ Created {filename}")
 
 def main():
     """Create all required icon sizes."""
@@ -65,11 +81,22 @@ def main():
     
     sizes = [16, 48, 128]
     
-    for size in sizes:
-        try:
-            create_icon(size, f"icon{size}.png")
-        except Exception as e:
-            print(f"✗ Failed to create icon{size}.png: {e}")
+    # Look the font up once instead of re-probing every candidate per size
+    font_spec = find_font()
+    
+    # Sizes are independent, so render them in parallel; results are
+    # reported in order from the parent to keep the output stable
+    with ProcessPoolExecutor(max_workers=len(sizes)) as executor:
+        futures = {
+            size: executor.submit(create_icon, size, f"icon{size}.png", font_spec)
+            for size in sizes
+        }
+        for size, future in futures.items():
+            try:
+                future.result()
+                print(f"✓ Created icon{size}.png")
+            except Exception as e:
+                print(f"✗ Failed to create icon{size}.png: {e}")
     
     print("")
     print("Icons created successfully!")
@@ -0,0 +1,171 @@
+"""
+Single-pass aggregation of Network Logger extension logs, used by analyze_logs.py.
+Kept as plain Python so it runs anywhere; for very large log dumps it can be
+compiled in place with `cythonize -i log_aggregate.py` (pip install Cython),
+and the compiled module is then imported instead of this file.
+"""
+
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+import sys
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+_NETLOC_RE = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)')
+
+@lru_cache(maxsize=200_000)
+def netloc(url):
+    """Return the network location of a URL (same as urlparse(url).netloc)."""
+    match = _NETLOC_RE.match(url)
+    return sys.intern(match.group(1)) if match else ''
+
+def intern_str(value):
+    """Intern string values; other JSON values are returned unchanged."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def build_pattern_matcher(patterns, first_only=False):
+    """Return a function listing the reasons of every pattern found in a string.
+    
+    With pyahocorasick installed all patterns are matched in one pass over the
+    string; reasons are always returned in pattern order. With first_only,
+    at most the first matching pattern's reason is returned.
+    """
+    if ahocorasick is None:
+        if first_only:
+            def match(text):
+                for pattern, reason in patterns:
+                    if pattern in text:
+                        return [reason]
+                return []
+        else:
+            def match(text):
+                return [reason for pattern, reason in patterns if pattern in text]
+        return match
+    
+    automaton = ahocorasick.Automaton()
+    for index, (pattern, _) in enumerate(patterns):
+        automaton.add_word(pattern, index)
+    automaton.make_automaton()
+    
+    def match(text):
+        found = {index for _, index in automaton.iter(text)}
+        if first_only and found:
+            return [patterns[min(found)][1]]
+        return [patterns[index][1] for index in sorted(found)]
+    return match
+
+def aggregate_logs(batches, match_suspicious):
+    """Gather every statistic reported by analyze_logs in one pass over the logs.
+    
+    Only counters and small top-N samples are kept in memory. Returns a dict
+    keyed by statistic name.
+    """
+    total_logs = 0
+    session_ids = set()
+    type_counts = Counter()
+    js_count = 0
+    js_domains = Counter()
+    blocked_count = 0
+    blocked_urls = []
+    status_bins = [0] * 600   # indexed by HTTP status code
+    status_counts = Counter()  # non-int codes and codes outside the bins
+    domain_counts = Counter()
+    page_domains = set()
+    third_party_resources = defaultdict(Counter)
+    eval_count = 0
+    eval_pages = Counter()
+    https_origins = set()
+    http_initiators = Counter()
+    suspicious_count = 0
+    suspicious_logs = []
+    failed_count = 0
+    failed_domains = Counter()
+    
+    for batch in batches:
+        session_ids.add(batch['sessionId'])
+        for log in batch['logs']:
+            # Bind the per-log lookups once; this body runs for every log
+            get = log.get
+            url = log['url']
+            is_https = url.startswith('https://')
+            is_http = not is_https and url.startswith('http://')
+            log_type = intern_str(get('type', 'unknown'))
+            domain = netloc(url)
+            total_logs += 1
+            
+            type_counts[log_type] += 1
+            domain_counts[domain] += 1
+            
+            if get('isJavaScript') or log_type == 'script':
+                js_count += 1
+                js_domains[domain] += 1
+            
+            if get('blocked'):
+                blocked_count += 1
+                if len(blocked_urls) < 10:
+                    blocked_urls.append(url)
+            
+            status = get('statusCode')
+            if status:
+                if type(status) is int and 0 < status < 600:
+                    status_bins[status] += 1
+                else:
+                    status_counts[status] += 1
+                if status >= 400:
+                    failed_count += 1
+                    failed_domains[domain] += 1
+            
+            initiator = get('initiator')
+            if log_type == 'navigation':
+                page_domains.add(domain)
+                if is_https:
+                    https_origins.add(domain)
+            elif initiator:
+                initiator_domain = netloc(initiator)
+                if initiator_domain and domain and initiator_domain != domain:
+                    third_party_resources[initiator_domain][domain] += 1
+            
+            if get('scriptUrl') == 'eval':
+                eval_count += 1
+                eval_pages[url] += 1
+            
+            if is_http:
+                http_initiators[initiator or ''] += 1
+            
+            for reason in match_suspicious(url.lower()):
+                suspicious_count += 1
+                if len(suspicious_logs) < 10:
+                    suspicious_logs.append((url, reason))
+    
+    status_counts.update({status: count for status, count in enumerate(status_bins) if count})
+    
+    # Mixed content: plain HTTP resources initiated by an HTTPS page
+    mixed_content = sum(
+        count for initiator, count in http_initiators.items()
+        if initiator.startswith('https://') and netloc(initiator) in https_origins
+    )
+    
+    return {
+        'total_logs': total_logs,
+        'session_count': len(session_ids),
+        'type_counts': type_counts,
+        'js_count': js_count,
+        'js_domains': js_domains,
+        'blocked_count': blocked_count,
+        'blocked_urls': blocked_urls,
+        'status_counts': status_counts,
+        'domain_counts': domain_counts,
+        'page_domains': page_domains,
+        'third_party_resources': third_party_resources,
+        'eval_count': eval_count,
+        'eval_pages': eval_pages,
+        'mixed_content': mixed_content,
+        'suspicious_count': suspicious_count,
+        'suspicious_logs': suspicious_logs,
+        'failed_count': failed_count,
+        'failed_domains': failed_domains,
+    }
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from analyze_youtube_blocks import analyze_youtube_blocks
+
+
+def blocked_log(channel_id, **extra):
+    log = {
+        'url': f'https://www.youtube.com/@{channel_id}',
+        'type': 'main_frame',
+        'timestamp': '2024-01-15T13:45:22.123Z',
+        'blocked': True,
+        'blockReason': 'youtube_channel',
+        'youtubeChannelInfo': {'id': channel_id, 'type': 'handle'},
+    }
+    log.update(extra)
+    return log
+
+
+def run(tmp_path, capsys, batches):
+    log_file = tmp_path / 'logs.json'
+    log_file.write_text(json.dumps(batches, separators=(',', ':')))
+    analyze_youtube_blocks(str(log_file))
+    return capsys.readouterr().out
+
+
+def test_counts_flat_logs(tmp_path, capsys):
+    out = run(tmp_path, capsys, [
+        {'sessionId': 's1', 'logs': [
+            blocked_log('a'),
+            {'url': 'https://example.com/', 'initiator': 'https://www.youtube.com'},
+            blocked_log('b'),
+        ]},
+    ])
+    assert 'Total YouTube requests: 2' in out
+    assert 'Blocked channel accesses: 2' in out
+
+
+def test_counts_logs_with_nested_object_arrays(tmp_path, capsys):
+    headers = [
+        {'name': 'Referer', 'value': 'https://www.youtube.com/'},
+        {'name': 'Accept', 'value': '*/*'},
+    ]
+    out = run(tmp_path, capsys, [
+        {'sessionId': 's1', 'logs': [
+            blocked_log('a', requestHeaders=headers),
+            blocked_log('b'),
+        ]},
+    ])
+    assert 'Total YouTube requests: 2' in out
+    assert 'Blocked channel accesses: 2' in out
+
+
+def test_counts_logs_with_nested_logs_key(tmp_path, capsys):
+    out = run(tmp_path, capsys, [
+        {'sessionId': 's1', 'logs': [
+            blocked_log('a', extra={'logs': [{'u': 1}, {'u': 2}]}),
+            blocked_log('b'),
+        ]},
+    ])
+    assert 'Total YouTube requests: 2' in out
+    assert 'Blocked channel accesses: 2' in out
+
+
+def test_truncated_file_is_invalid_json(tmp_path):
+    log_file = tmp_path / 'logs.json'
+    text = json.dumps([{'sessionId': 's1', 'logs': [blocked_log('a'), blocked_log('b')]}])
+    log_file.write_text(text[:len(text) // 2])
+    with pytest.raises(json.JSONDecodeError):
+        analyze_youtube_blocks(str(log_file))
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+import log_aggregate
+from analyze_logs import iter_batches
+from log_aggregate import aggregate_logs, build_pattern_matcher
+
+PATTERNS = [('.tk', 'tk'), ('eval', 'eval')]
+
+
+def aggregate(batches, first_only=False):
+    return aggregate_logs(batches, build_pattern_matcher(PATTERNS, first_only))
+
+
+def test_streams_logs_before_session_id():
+    data = json.dumps([
+        {'logs': [{'url': 'https://a.com/'}, {'url': 'https://b.com/'}], 'sessionId': 's1'},
+        {'logs': [{'url': 'https://a.com/x'}], 'sessionId': 's2'},
+    ])
+    stats = aggregate(iter_batches(io.BytesIO(data.encode())))
+    assert stats['total_logs'] == 3
+    assert stats['session_count'] == 2
+    assert stats['domain_counts'] == {'a.com': 2, 'b.com': 1}
+
+
+def test_non_int_status_codes_are_counted_as_is():
+    stats = aggregate([{'sessionId': 's1', 'logs': [
+        {'url': 'https://a.com/', 'statusCode': 200},
+        {'url': 'https://a.com/', 'statusCode': 404.0},
+        {'url': 'https://a.com/', 'statusCode': True},
+    ]}])
+    assert stats['status_counts'] == {200: 1, 404.0: 1, True: 1}
+    assert {type(status) for status in stats['status_counts']} == {int, float, bool}
+    assert stats['failed_count'] == 1
+
+
+def test_mixed_content_requires_https_page_origin():
+    stats = aggregate([{'sessionId': 's1', 'logs': [
+        {'url': 'https://secure.com/', 'type': 'navigation'},
+        {'url': 'http://cdn.com/a.js', 'initiator': 'https://secure.com'},
+        {'url': 'http://cdn.com/b.js', 'initiator': 'https://secure.com/page'},
+        {'url': 'http://cdn.com/c.js', 'initiator': 'https://other.com'},
+        {'url': 'http://cdn.com/d.js', 'initiator': 'http://secure.com'},
+    ]}])
+    assert stats['mixed_content'] == 2
+
+
+@pytest.mark.parametrize('automaton', [True, False])
+def test_first_only_reports_first_pattern(monkeypatch, automaton):
+    if not automaton:
+        monkeypatch.setattr(log_aggregate, 'ahocorasick', None)
+    elif log_aggregate.ahocorasick is None:
+        pytest.skip('pyahocorasick is not installed')
+    url = 'https://evil.tk/eval'
+    assert build_pattern_matcher(PATTERNS)(url) == ['tk', 'eval']
+    assert build_pattern_matcher(PATTERNS, first_only=True)(url) == ['tk']
+    assert build_pattern_matcher(PATTERNS, first_only=True)('https://a.com/eval') == ['eval']
+    assert build_pattern_matcher(PATTERNS, first_only=True)('https://a.com/') == []
+
+
+def test_samples_are_capped_at_ten():
+    logs = [{'url': f'https://evil.tk/{i}', 'blocked': True} for i in range(12)]
+    stats = aggregate([{'sessionId': 's1', 'logs': logs}])
+    assert stats['blocked_count'] == 12
+    assert stats['blocked_urls'] == [log['url'] for log in logs[:10]]
+    assert stats['suspicious_count'] == 12
+    assert stats['suspicious_logs'] == [(log['url'], 'tk') for log in logs[:10]]